@@ -14,13 +14,18 @@ from fastapi.responses import FileResponse, JSONResponse
 import uvicorn
 import asyncio
 import aiohttp
+import contextvars
+from collections import OrderedDict, deque
 from typing import Optional
 
+from profiling import Profiler, ProfilingMiddleware
+
 
 class MeshyAI3DGenerator:
-    def __init__(self, api_key: str = None):
+    def __init__(self, api_key: str = None, profiler: Profiler = None):
         self.api_key = api_key or os.getenv('MESHY_API_KEY')
         self.base_url = "https://api.meshy.ai"
+        self.profiler = profiler or Profiler()
         
         if not self.api_key:
             print("⚠️  WARNING: No Meshy API key provided!")
@@ -286,18 +291,12 @@ class MeshyAI3DGenerator:
         }
         
         try:
-            # Step 1: Upload image
-            print("📤 Step 1: Uploading image to Meshy...")
-            analysis["status"] = "uploading"
-            image_id = await self.upload_image_to_meshy(image_path)
-            
-            if not image_id:
-                raise Exception("Failed to upload image to Meshy")
-            
-            # Step 2: Create 3D generation task
-            print("🎯 Step 2: Creating 3D generation task...")
+            # Steps 1-2: Upload image and create 3D generation task
+            # (the image is sent inline with the task; there is no separate upload call)
+            print("📤 Step 1-2: Uploading image and creating 3D generation task...")
             analysis["status"] = "creating_task"
-            task_id = await self.create_image_to_3d_task(image_id, prompt)
+            with self.profiler.stage("create_task"):
+                task_id = await self.create_meshy_task_directly(image_path, prompt)
             
             if not task_id:
                 raise Exception("Failed to create 3D generation task")
@@ -305,7 +304,8 @@ class MeshyAI3DGenerator:
             # Step 3: Wait for generation to complete
             print("⏳ Step 3: Waiting for 3D generation (this can take 5-10 minutes)...")
             analysis["status"] = "generating"
-            task_result = await self.poll_task_status(task_id)
+            with self.profiler.stage("generate"):
+                task_result = await self.poll_task_status(task_id)
             
             if not task_result:
                 raise Exception("3D generation failed or timed out")
@@ -320,7 +320,8 @@ class MeshyAI3DGenerator:
             if not glb_url:
                 raise Exception("No GLB download URL in task result")
             
-            glb_path = await self.download_glb_model(glb_url)
+            with self.profiler.stage("download"):
+                glb_path = await self.download_glb_model(glb_url)
             
             # Step 5: Analyze final model
             analysis["status"] = "completed"
@@ -328,19 +329,20 @@ class MeshyAI3DGenerator:
             analysis["file_size_bytes"] = os.path.getsize(glb_path)
             
             # Get mesh statistics
-            try:
-                mesh = trimesh.load(glb_path)
-                if hasattr(mesh, 'vertices') and hasattr(mesh, 'faces'):
-                    analysis["vertex_count"] = len(mesh.vertices)
-                    analysis["face_count"] = len(mesh.faces)
-                elif hasattr(mesh, 'geometry'):
-                    # Handle scene with multiple geometries
-                    total_vertices = sum(len(geom.vertices) for geom in mesh.geometry.values())
-                    total_faces = sum(len(geom.faces) for geom in mesh.geometry.values())
-                    analysis["vertex_count"] = total_vertices
-                    analysis["face_count"] = total_faces
-            except Exception as e:
-                print(f"⚠️  Could not analyze mesh: {e}")
+            with self.profiler.stage("analyze"):
+                try:
+                    mesh = trimesh.load(glb_path)
+                    if hasattr(mesh, 'vertices') and hasattr(mesh, 'faces'):
+                        analysis["vertex_count"] = len(mesh.vertices)
+                        analysis["face_count"] = len(mesh.faces)
+                    elif hasattr(mesh, 'geometry'):
+                        # Handle scene with multiple geometries
+                        total_vertices = sum(len(geom.vertices) for geom in mesh.geometry.values())
+                        total_faces = sum(len(geom.faces) for geom in mesh.geometry.values())
+                        analysis["vertex_count"] = total_vertices
+                        analysis["face_count"] = total_faces
+                except Exception as e:
+                    print(f"⚠️  Could not analyze mesh: {e}")
             
             print(f"🎉 3D model generated successfully!")
             print(f"📊 Stats: {analysis['vertex_count']:,} vertices, {analysis['face_count']:,} faces")
@@ -359,33 +361,36 @@ class MeshyAI3DGenerator:
         """Create fallback model when API is unavailable"""
         print("🔄 Creating fallback 3D model...")
         
-        # Analyze prompt to determine object type
-        prompt_lower = prompt.lower()
+        with self.profiler.stage("build_mesh"):
+            # Analyze prompt to determine object type
+            prompt_lower = prompt.lower()
         
-        if any(word in prompt_lower for word in ['car', 'vehicle', 'automobile', 'truck']):
-            mesh = self.create_detailed_car()
-        elif any(word in prompt_lower for word in ['person', 'human', 'man', 'woman']):
-            mesh = self.create_detailed_person()
-        elif any(word in prompt_lower for word in ['building', 'house', 'structure']):
-            mesh = self.create_detailed_building()
-        else:
-            mesh = self.create_detailed_object()
+            if any(word in prompt_lower for word in ['car', 'vehicle', 'automobile', 'truck']):
+                mesh = self.create_detailed_car()
+            elif any(word in prompt_lower for word in ['person', 'human', 'man', 'woman']):
+                mesh = self.create_detailed_person()
+            elif any(word in prompt_lower for word in ['building', 'house', 'structure']):
+                mesh = self.create_detailed_building()
+            else:
+                mesh = self.create_detailed_object()
         
         # Apply texture from image
-        try:
-            img = cv2.imread(image_path)
-            img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            img_resized = cv2.resize(img_rgb, (1024, 1024))  # Higher res texture
-            texture_img = Image.fromarray(img_resized)
+        with self.profiler.stage("texture"):
+            try:
+                img = cv2.imread(image_path)
+                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+                img_resized = cv2.resize(img_rgb, (1024, 1024))  # Higher res texture
+                texture_img = Image.fromarray(img_resized)
             
-            # Better UV mapping
-            mesh.visual = trimesh.visual.TextureVisuals(image=texture_img)
-        except Exception as e:
-            print(f"⚠️  Texture application failed: {e}")
+                # Better UV mapping
+                mesh.visual = trimesh.visual.TextureVisuals(image=texture_img)
+            except Exception as e:
+                print(f"⚠️  Texture application failed: {e}")
         
         # Export
-        output_path = f"temp/{uuid.uuid4()}_fallback.glb"
-        mesh.export(output_path, file_type='glb')
+        with self.profiler.stage("export"):
+            output_path = f"temp/{uuid.uuid4()}_fallback.glb"
+            mesh.export(output_path, file_type='glb')
         
         analysis = {
             "service": "fallback_template",
@@ -554,7 +559,22 @@ app.add_middleware(
 
 # Initialize generator
 meshy_api_key = os.getenv('MESHY_API_KEY')
-generator = MeshyAI3DGenerator(meshy_api_key)
+profiler = Profiler()
+generator = MeshyAI3DGenerator(meshy_api_key, profiler)
+
+# Profile requests sent with `X-Profile: 1`, or all requests if PROFILE_REQUESTS=1
+app.add_middleware(ProfilingMiddleware, profiler=profiler)
+
+
+@app.on_event("startup")
+async def start_loop_lag_monitor():
+    if profiler.config.loop_lag_monitor:
+        profiler.loop_lag.start()
+
+
+@app.on_event("shutdown")
+async def stop_loop_lag_monitor():
+    await profiler.loop_lag.stop()
 
 
 @app.post("/generate-3d")
@@ -572,21 +592,24 @@ async def generate_3d_model(
     """
     file_id = str(uuid.uuid4())
     input_path = f"temp/{file_id}_input.jpg"
+    request_start = time.time()
     
     try:
         # Create temp directory
         os.makedirs("temp", exist_ok=True)
         
         # Save uploaded image
-        with open(input_path, "wb") as f:
-            content = await image.read()
-            f.write(content)
+        with profiler.stage("save_upload"):
+            with open(input_path, "wb") as f:
+                content = await image.read()
+                f.write(content)
         
         print(f"🖼️  Processing image: {image.filename}")
         print(f"💬 Prompt: '{prompt}'")
         
         # Generate 3D model
-        if use_meshy and generator.api_key:
+        used_meshy = bool(use_meshy and generator.api_key)
+        if used_meshy:
             print("🚀 Using Meshy AI for true 3D generation...")
             glb_path, analysis = await generator.generate_3d_from_image(input_path, prompt)
         else:
@@ -598,6 +621,7 @@ async def generate_3d_model(
             raise Exception("Generated GLB file is invalid")
         
         print(f"✅ 3D model ready: {glb_path}")
+        record_time_to_first_model("direct", used_meshy, time.time() - request_start)
         
         response = FileResponse(
             glb_path,
@@ -632,6 +656,242 @@ async def generate_3d_model(
             pass
 
 
+# Speculative generation: a local fallback preview is built while Meshy runs
+MAX_TRACKED_JOBS = 100
+generation_jobs = OrderedDict()
+# Keyed by (mode, service): fallback requests take under a second, Meshy ones minutes
+time_to_first_model = {
+    (mode, service): deque(maxlen=200)
+    for mode in ("direct", "speculative")
+    for service in ("meshy_ai", "fallback_template")
+}
+
+
+def record_time_to_first_model(mode: str, used_meshy: bool, seconds: float):
+    """Track how long a client waited before it had any model to show"""
+    service = "meshy_ai" if used_meshy else "fallback_template"
+    time_to_first_model[(mode, service)].append(seconds)
+
+
+def time_to_first_model_summary() -> dict:
+    summary = {}
+    for (mode, service), samples in time_to_first_model.items():
+        ordered = sorted(samples)
+        summary.setdefault(mode, {})[service] = {
+            "count": len(ordered),
+            "mean_seconds": sum(ordered) / len(ordered) if ordered else None,
+            "p50_seconds": ordered[len(ordered) // 2] if ordered else None,
+            "p95_seconds": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))] if ordered else None
+        }
+    return summary
+
+
+def evict_finished_jobs():
+    """Forget the oldest finished jobs beyond MAX_TRACKED_JOBS; running jobs are never evicted"""
+    excess = len(generation_jobs) - MAX_TRACKED_JOBS
+    for job_id in list(generation_jobs):
+        if excess <= 0:
+            break
+        if generation_jobs[job_id].status in ("completed", "preview_only", "failed"):
+            del generation_jobs[job_id]
+            excess -= 1
+
+
+def is_valid_glb(path: Optional[str]) -> bool:
+    """Non-empty file with the binary glTF magic header"""
+    try:
+        with open(path, 'rb') as f:
+            return f.read(4) == b'glTF'
+    except Exception:
+        return False
+
+
+class GenerationJob:
+    """State of one speculative generation: preview first, then the final model"""
+
+    def __init__(self, prompt: str, use_meshy: bool):
+        self.id = str(uuid.uuid4())
+        self.prompt = prompt
+        self.use_meshy = use_meshy
+        self.uses_meshy = bool(use_meshy and generator.api_key)
+        self.input_path = f"temp/{self.id}_input.jpg"
+        self.created_at = time.time()
+        self.status = "pending"
+        self.preview_path = None
+        self.preview_analysis = None
+        self.final_path = None
+        self.final_analysis = None
+        self.time_to_first_model = None
+        self.time_to_final_model = None
+        self.error = None
+        self.task = None
+
+    def mark_first_model(self):
+        if self.time_to_first_model is None:
+            self.time_to_first_model = time.time() - self.created_at
+            record_time_to_first_model("speculative", self.uses_meshy, self.time_to_first_model)
+
+    def to_dict(self) -> dict:
+        return {
+            "job_id": self.id,
+            "status": self.status,
+            "prompt": self.prompt,
+            "use_meshy": self.use_meshy,
+            "preview_url": f"/generate-3d/jobs/{self.id}/preview" if self.preview_path else None,
+            "final_url": f"/generate-3d/jobs/{self.id}/final" if self.final_path else None,
+            "preview_analysis": self.preview_analysis,
+            "final_analysis": self.final_analysis,
+            "time_to_first_model": self.time_to_first_model,
+            "time_to_final_model": self.time_to_final_model,
+            "error": self.error
+        }
+
+
+async def run_generation_job(job: GenerationJob):
+    """Build the fallback preview and the Meshy model concurrently"""
+
+    async def build_preview():
+        # create_fallback_model is CPU-bound cv2/trimesh work, keep it off the event loop
+        glb_path, analysis = await asyncio.to_thread(generator.create_fallback_model, job.input_path, job.prompt)
+        if not is_valid_glb(glb_path):
+            raise Exception("Generated preview GLB file is invalid")
+        job.preview_path = glb_path
+        job.preview_analysis = analysis
+        if job.status == "generating":
+            job.status = "preview_ready"
+        job.mark_first_model()
+        print(f"👀 Preview ready for job {job.id} after {job.time_to_first_model:.2f}s")
+
+    async def build_final():
+        glb_path, analysis = await generator.generate_3d_from_image(job.input_path, job.prompt)
+        if not is_valid_glb(glb_path):
+            raise Exception("Generated GLB file is invalid")
+        job.final_path = glb_path
+        job.final_analysis = analysis
+        job.status = "completed"
+        job.time_to_final_model = time.time() - job.created_at
+        job.mark_first_model()
+        print(f"✅ Final model ready for job {job.id} after {job.time_to_final_model:.1f}s")
+
+    job.status = "generating"
+    try:
+        if job.uses_meshy:
+            preview_result, final_result = await asyncio.gather(
+                build_preview(), build_final(), return_exceptions=True
+            )
+            if isinstance(final_result, Exception):
+                job.error = str(final_result)
+                # The preview is still a usable model; only fail if there is nothing to show
+                job.status = "preview_only" if job.preview_path else "failed"
+                print(f"❌ Meshy generation failed for job {job.id}: {final_result}")
+            if isinstance(preview_result, Exception):
+                print(f"⚠️  Preview failed for job {job.id}: {preview_result}")
+                if job.status != "completed":
+                    job.status = "failed"
+                    job.error = job.error or str(preview_result)
+        else:
+            # Without Meshy the fallback is the final model
+            await build_preview()
+            job.final_path = job.preview_path
+            job.final_analysis = job.preview_analysis
+            job.status = "completed"
+            job.time_to_final_model = job.time_to_first_model
+    except Exception as e:
+        job.status = "failed"
+        job.error = str(e)
+        print(f"❌ Generation job {job.id} failed: {e}")
+    finally:
+        # Cleanup input file
+        try:
+            if os.path.exists(job.input_path):
+                os.remove(job.input_path)
+        except:
+            pass
+
+
+@app.post("/generate-3d/jobs", status_code=202)
+async def start_generation_job(
+    image: UploadFile = File(...),
+    prompt: str = Form(""),
+    use_meshy: bool = Form(True)
+):
+    """
+    Start a speculative generation job and return immediately
+
+    A local fallback preview is built while Meshy runs. Poll
+    `GET /generate-3d/jobs/{job_id}`: `preview_url` appears within about a
+    second and `final_url` once the Meshy model is downloaded and checked.
+    """
+    job = GenerationJob(prompt, use_meshy)
+
+    os.makedirs("temp", exist_ok=True)
+    with profiler.stage("save_upload"):
+        with open(job.input_path, "wb") as f:
+            content = await image.read()
+            f.write(content)
+
+    print(f"🖼️  Speculative job {job.id} for image: {image.filename}")
+    print(f"💬 Prompt: '{prompt}'")
+
+    generation_jobs[job.id] = job
+    evict_finished_jobs()
+
+    # Start the job in an empty context so it does not inherit this request's
+    # profile; otherwise its stages would be recorded into a request that already returned
+    job.task = contextvars.Context().run(asyncio.create_task, run_generation_job(job))
+    return {
+        **job.to_dict(),
+        "status_url": f"/generate-3d/jobs/{job.id}"
+    }
+
+
+@app.get("/generate-3d/jobs/{job_id}")
+async def generation_job_status(job_id: str):
+    """Progress of a speculative generation job"""
+    job = generation_jobs.get(job_id)
+    if not job:
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"No generation job with id {job_id}"}
+        )
+    return job.to_dict()
+
+
+def job_model_response(job: Optional[GenerationJob], path_attr: str, analysis_attr: str, stage: str):
+    if not job or not getattr(job, path_attr):
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"No {stage} model available yet"}
+        )
+
+    analysis = getattr(job, analysis_attr) or {}
+    return FileResponse(
+        getattr(job, path_attr),
+        media_type="model/gltf-binary",
+        filename=f"meshy_3d_{job.id}_{stage}.glb",
+        headers={
+            "X-Generation-Analysis": json.dumps(analysis),
+            "X-Generation-Service": analysis.get("service", "unknown"),
+            "X-Model-Quality": analysis.get("model_quality", "unknown"),
+            "X-Model-Stage": stage
+        }
+    )
+
+
+@app.get("/generate-3d/jobs/{job_id}/preview")
+async def generation_job_preview(job_id: str):
+    """Locally generated placeholder model"""
+    job = generation_jobs.get(job_id)
+    return job_model_response(job, "preview_path", "preview_analysis", "preview")
+
+
+@app.get("/generate-3d/jobs/{job_id}/final")
+async def generation_job_final(job_id: str):
+    """Final model (Meshy output, or the fallback when Meshy is not used)"""
+    job = generation_jobs.get(job_id)
+    return job_model_response(job, "final_path", "final_analysis", "final")
+
+
 @app.get("/")
 async def root():
     return {
@@ -639,7 +899,10 @@ async def root():
         "description": "Generate complete 3D models with all sides from single images",
         "endpoints": {
             "POST /generate-3d": "Upload image and generate 3D model",
+            "POST /generate-3d/jobs": "Start a job that returns a quick preview, then the final model",
+            "GET /generate-3d/jobs/{job_id}": "Check a generation job",
             "GET /status": "Check service status",
+            "GET /debug/profiling": "Event loop lag and recent request profiles",
             "GET /docs": "API documentation"
         },
         "features": [
@@ -679,10 +942,38 @@ async def service_status():
                 "Image-based textures",
                 "Good for prototyping"
             ]
-        }
+        },
+        "generation_jobs": {
+            "tracked": len(generation_jobs),
+            "running": sum(1 for job in generation_jobs.values() if job.status in ("generating", "preview_ready"))
+        },
+        "time_to_first_model": time_to_first_model_summary()
     }
 
 
+@app.get("/debug/profiling")
+async def profiling_status():
+    """Event loop lag statistics and recent request profiles (send `X-Profile: 1` to profile a request)"""
+    return profiler.summary()
+
+
+@app.get("/debug/profiling/{profile_id}")
+async def profiling_flamegraph(profile_id: str):
+    """Collapsed stacks for one profiled request (flamegraph.pl / speedscope input)"""
+    profile = profiler.get_profile(profile_id)
+    if not profile or not profile.flamegraph_path or not os.path.exists(profile.flamegraph_path):
+        return JSONResponse(
+            status_code=404,
+            content={"error": f"No profile with id {profile_id}"}
+        )
+
+    return FileResponse(
+        profile.flamegraph_path,
+        media_type="text/plain",
+        filename=f"{profile_id}.folded"
+    )
+
+
 @app.post("/test-meshy")
 async def test_meshy_connection():
     """Test Meshy API connection"""
@@ -48,6 +48,8 @@ const viewer = new GaussianSplats3D.Viewer({
 
 // -------------------- State --------------------
 let chunkMeta = []; // each: { i,j,k, center: THREE.Vector3, lods: {low:{path,loaded,promise}, med:..., high:...}, currentLOD }
+let chunkTree = null; // octree root from a hierarchical manifest (splat_manifest.py build); null for flat manifests
+const upgradedChunks = new Set(); // chunks currently holding a med/high LOD
 let skybox = null;
 let allowUpgrades = false;   // only becomes true after low loads complete AND camera movement
 let lowLoadsComplete = false;
@@ -87,14 +89,16 @@ function processQueue() {
 }
 
 // -------------------- Manifest loader (manifest entries contain center, i,j,k, lod, filename) --------------------
+// Accepts either the flat entry list or the hierarchical { entries, chunks, octree } manifest
 async function loadManifest() {
   try {
     const resp = await fetch(`${BASE_CHUNK_URL}manifest.json`);
     const data = await resp.json();
+    const entries = Array.isArray(data) ? data : data.entries;
 
     // group per chunk index (i_j_k)
     const map = {};
-    for (const entry of data) {
+    for (const entry of entries) {
       const key = `${entry.i}_${entry.j}_${entry.k}`;
       if (!map[key]) {
         map[key] = {
@@ -113,14 +117,32 @@ async function loadManifest() {
       };
     }
 
-    chunkMeta = Object.values(map);
-    console.log(`Manifest loaded: ${chunkMeta.length} chunks`);
+    if (!Array.isArray(data) && data.octree) {
+      // octree leaves reference chunks by index into data.chunks
+      chunkMeta = data.chunks.map(c => map[`${c.i}_${c.j}_${c.k}`]);
+      chunkTree = prepareOctreeNode(data.octree);
+    } else {
+      chunkMeta = Object.values(map);
+      chunkTree = null;
+    }
+    console.log(`Manifest loaded: ${chunkMeta.length} chunks${chunkTree ? ' (octree)' : ''}`);
   } catch (err) {
     console.error('Failed to load manifest:', err);
     throw err;
   }
 }
 
+// convert octree node bounds to Box3 and leaf indices to chunk references once, up front
+function prepareOctreeNode(node) {
+  node.box = new THREE.Box3(new THREE.Vector3(...node.min), new THREE.Vector3(...node.max));
+  if (node.items) {
+    node.items = node.items.map(index => chunkMeta[index]).filter(Boolean);
+  } else {
+    node.children.forEach(prepareOctreeNode);
+  }
+  return node;
+}
+
 // -------------------- Phase 1: Load ALL low LODs and WAIT until complete --------------------
 async function loadAllLowLODs() {
   console.log('Phase 1: Enqueueing low LOD loads for all chunks (concurrency-limited)...');
@@ -213,6 +235,31 @@ async function handleVisibleUpgrades() {
 
   const cameraPos = viewer.camera.position;
 
+  if (chunkTree) {
+    // Only upgraded chunks can need med/high removed, so check those instead of every chunk
+    for (const chunk of [...upgradedChunks]) {
+      if (!_frustum.intersectsSphere(new THREE.Sphere(chunk.center, CHUNK_SPHERE_RADIUS))) {
+        await removeMedHigh(chunk);
+      }
+    }
+    // Walk the octree, skipping subtrees outside the frustum or beyond load distance
+    const stack = [chunkTree];
+    while (stack.length > 0) {
+      const node = stack.pop();
+      if (node.box.distanceToPoint(cameraPos) >= CAMERA_LOAD_DISTANCE) continue;
+      if (!_frustum.intersectsBox(node.box)) continue;
+      if (node.items) {
+        for (const chunk of node.items) {
+          if (!_frustum.intersectsSphere(new THREE.Sphere(chunk.center, CHUNK_SPHERE_RADIUS))) continue;
+          requestChunkLOD(chunk, cameraPos.distanceTo(chunk.center));
+        }
+      } else {
+        for (const child of node.children) stack.push(child);
+      }
+    }
+    return;
+  }
+
   // Iterate chunks and process visible ones
   for (const chunk of chunkMeta) {
     const visible = _frustum.intersectsSphere(new THREE.Sphere(chunk.center, CHUNK_SPHERE_RADIUS));
@@ -222,29 +269,33 @@ async function handleVisibleUpgrades() {
       continue;
     }
 
-    const dist = cameraPos.distanceTo(chunk.center);
-    let desiredLOD = null;
-    if (dist < CAMERA_HIGH_DISTANCE) desiredLOD = 'high';
-    else if (dist < CAMERA_MEDIUM_DISTANCE) desiredLOD = 'med';
-    else if (dist < CAMERA_LOAD_DISTANCE) desiredLOD = 'low';
+    requestChunkLOD(chunk, cameraPos.distanceTo(chunk.center));
+  }
+}
 
-    if (!desiredLOD) {
-      // visible but beyond load distance; keep low
-      continue;
-    }
+// pick the LOD for a visible chunk by distance and start upgrading it if needed
+function requestChunkLOD(chunk, dist) {
+  let desiredLOD = null;
+  if (dist < CAMERA_HIGH_DISTANCE) desiredLOD = 'high';
+  else if (dist < CAMERA_MEDIUM_DISTANCE) desiredLOD = 'med';
+  else if (dist < CAMERA_LOAD_DISTANCE) desiredLOD = 'low';
 
-    // If desired higher than current, sequentially upgrade
-    const currentIndex = chunk.currentLOD ? LOD_ORDER.indexOf(chunk.currentLOD) : -1;
-    const targetIndex = LOD_ORDER.indexOf(desiredLOD);
+  if (!desiredLOD) {
+    // visible but beyond load distance; keep low
+    return;
+  }
 
-    if (targetIndex > currentIndex) {
-      // Kick off sequential upgrade but do not block whole loop
-      upgradeChunkSequential(chunk, currentIndex, targetIndex).catch(err => {
-        console.warn('Upgrade failed for chunk', chunk.i, chunk.j, chunk.k, err);
-      });
-    }
-    // If desired is lower than current, we could consider downgrading, but we keep current until it's out of frustum to simplify
+  // If desired higher than current, sequentially upgrade
+  const currentIndex = chunk.currentLOD ? LOD_ORDER.indexOf(chunk.currentLOD) : -1;
+  const targetIndex = LOD_ORDER.indexOf(desiredLOD);
+
+  if (targetIndex > currentIndex) {
+    // Kick off sequential upgrade but do not block whole loop
+    upgradeChunkSequential(chunk, currentIndex, targetIndex).catch(err => {
+      console.warn('Upgrade failed for chunk', chunk.i, chunk.j, chunk.k, err);
+    });
   }
+  // If desired is lower than current, we could consider downgrading, but we keep current until it's out of frustum to simplify
 }
 
 // sequential upgrade implementation with waiting on previous LOD
@@ -265,6 +316,7 @@ async function upgradeChunkSequential(chunk, currentIndex, targetIndex) {
             .then(() => {
               prevEntry.loaded = true;
               chunk.currentLOD = prev;
+              if (prev !== 'low') upgradedChunks.add(chunk);
               return prevEntry.path;
             })
             .catch(err => {
@@ -283,6 +335,7 @@ async function upgradeChunkSequential(chunk, currentIndex, targetIndex) {
           .then(() => {
             lodEntry.loaded = true;
             chunk.currentLOD = lod;
+            if (lod !== 'low') upgradedChunks.add(chunk);
             return lodEntry.path;
           })
           .catch(err => {
@@ -317,13 +370,15 @@ async function removeMedHigh(chunk) {
       // Keep entry.promise as-is (allows later reuse), but we mark not loaded.
     }
   }
+  upgradedChunks.delete(chunk);
 }
 
 // -------------------- Optional: aggressively unload very far chunks (keeps only low) --------------------
 function unloadVeryFarChunks() {
   const cameraPos = viewer.camera.position;
   const UNLOAD_DISTANCE = CAMERA_LOAD_DISTANCE * 2.5;
-  for (const chunk of chunkMeta) {
+  // only chunks holding med/high have anything to unload
+  for (const chunk of [...upgradedChunks]) {
     const d = cameraPos.distanceTo(chunk.center);
     if (d > UNLOAD_DISTANCE) {
       // remove med/high
@@ -334,6 +389,7 @@ function unloadVeryFarChunks() {
           e.loaded = false;
         }
       }
+      upgradedChunks.delete(chunk);
       // optionally remove low too if you want ultra aggressive unload, but you specified keep low
     }
   }
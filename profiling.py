@@ -0,0 +1,332 @@
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+import tracemalloc
+import uuid
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Optional
+
+
+PROFILE_HEADER = "X-Profile"
+PROFILE_HEADER_BYTES = PROFILE_HEADER.lower().encode("latin-1")
+
+
+def _env_flag(name: str, default: str = "0") -> bool:
+    return os.getenv(name, default).lower() in ("1", "true", "yes", "on")
+
+
+class ProfilingConfig:
+    """Profiling switches, read from the environment like MESHY_API_KEY"""
+
+    def __init__(self):
+        # Profile every request, not just those sent with the X-Profile header
+        self.profile_all_requests = _env_flag("PROFILE_REQUESTS")
+        self.sample_interval = float(os.getenv("PROFILE_SAMPLE_INTERVAL", "0.005"))
+        self.output_dir = os.getenv("PROFILE_OUTPUT_DIR", "temp/profiles")
+        self.max_profiles = int(os.getenv("PROFILE_MAX_KEPT", "50"))
+        # The loop lag monitor is a single sleeping task, so it is on by default
+        self.loop_lag_monitor = _env_flag("LOOP_LAG_MONITOR", "1")
+        self.loop_lag_interval = float(os.getenv("LOOP_LAG_INTERVAL", "0.25"))
+        self.loop_lag_threshold = float(os.getenv("LOOP_LAG_THRESHOLD", "0.1"))
+
+    def to_dict(self) -> dict:
+        return dict(vars(self))
+
+
+def collapsed_stacks(stacks: Counter) -> str:
+    """Collapsed stacks ("a;b;c count"), the input format of flamegraph.pl, speedscope and inferno"""
+    return "".join(f"{stack} {count}\n" for stack, count in stacks.most_common())
+
+
+class StackSampler:
+    """
+    Samples the Python stack of one thread from a background thread and
+    counts how often each stack was seen.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            names = []
+            while frame is not None:
+                code = frame.f_code
+                names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})")
+                frame = frame.f_back
+            with self._lock:
+                self.stacks[";".join(reversed(names))] += 1
+
+    def snapshot(self) -> Counter:
+        with self._lock:
+            return Counter(self.stacks)
+
+
+class RequestProfile:
+    """Profiling data for one request: stack samples plus per-stage time and peak memory"""
+
+    def __init__(self, method: str, path: str):
+        self.id = str(uuid.uuid4())
+        self.method = method
+        self.path = path
+        self.started_at = time.time()
+        self.duration = 0.0
+        self.status_code = None
+        self.samples = 0
+        self.flamegraph_path = None
+        self.stages = []
+        # Other profiled requests that ran at the same time; their work is in this flame graph too
+        self.overlapped_with = []
+
+    def to_dict(self) -> dict:
+        return {
+            "id": self.id,
+            "method": self.method,
+            "path": self.path,
+            "started_at": self.started_at,
+            "duration": self.duration,
+            "status_code": self.status_code,
+            "samples": self.samples,
+            "flamegraph": self.flamegraph_path,
+            "overlapped_with": self.overlapped_with,
+            "stages": self.stages
+        }
+
+
+class EventLoopLagMonitor:
+    """Measures how late a periodic sleep wakes up, i.e. how long the loop was blocked"""
+
+    def __init__(self, interval: float, threshold: float, history: int = 240):
+        self.interval = interval
+        self.threshold = threshold
+        self.recent = deque(maxlen=history)
+        self.max_lag = 0.0
+        self.total_lag = 0.0
+        self.checks = 0
+        self.slow_checks = 0
+        self._task = None
+
+    def start(self):
+        if self._task is None:
+            self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - expected)
+            self.recent.append((time.time(), lag))
+            self.checks += 1
+            self.total_lag += lag
+            self.max_lag = max(self.max_lag, lag)
+            if lag >= self.threshold:
+                self.slow_checks += 1
+                print(f"🐌 Event loop blocked for {lag * 1000:.0f} ms")
+
+    def stats(self) -> dict:
+        return {
+            "running": self._task is not None,
+            "interval": self.interval,
+            "threshold": self.threshold,
+            "checks": self.checks,
+            "slow_checks": self.slow_checks,
+            "mean_lag_ms": self.total_lag / self.checks * 1000 if self.checks else 0.0,
+            "max_lag_ms": self.max_lag * 1000,
+            "recent_ms": [(at, lag * 1000) for at, lag in self.recent]
+        }
+
+
+class Profiler:
+    """
+    Opt-in request profiling for the FastAPI service.
+
+    Nothing is sampled or traced unless a request is profiled (X-Profile header
+    or PROFILE_REQUESTS=1); stage() is a plain context-variable check otherwise.
+    """
+
+    def __init__(self, config: ProfilingConfig = None):
+        self.config = config or ProfilingConfig()
+        self.profiles = deque(maxlen=self.config.max_profiles)
+        self.loop_lag = EventLoopLagMonitor(self.config.loop_lag_interval, self.config.loop_lag_threshold)
+        self._current = contextvars.ContextVar("request_profile", default=None)
+        self._tracing_requests = 0
+        self._started_tracing = False
+        # One sampler thread shared by all profiled requests that are running
+        self._sampler = None
+        self._active_profiles = {}
+        self._stage_lock = threading.Lock()
+        self._active_stages = {}
+
+    def should_profile(self, scope: dict) -> bool:
+        if self.config.profile_all_requests:
+            return True
+        for name, value in scope.get("headers", ()):
+            if name == PROFILE_HEADER_BYTES:
+                return value.decode("latin-1").lower() in ("1", "true", "yes", "on")
+        return False
+
+    async def profile_asgi(self, app, scope: dict, receive, send):
+        """Run one HTTP request through `app` under the sampler and tracemalloc"""
+        profile = RequestProfile(scope.get("method", ""), scope.get("path", ""))
+        token = self._current.set(profile)
+
+        # The sampler sees the whole event loop thread, so requests profiled at the same
+        # time share one sampler and each records which others it overlapped
+        if self._sampler is None:
+            self._sampler = StackSampler(threading.get_ident(), self.config.sample_interval)
+            self._sampler.start()
+        sampler = self._sampler
+        for other in self._active_profiles.values():
+            other.overlapped_with.append(profile.id)
+            profile.overlapped_with.append(other.id)
+        self._active_profiles[profile.id] = profile
+
+        # tracemalloc is process-wide; keep it running while any profiled request is
+        # active, but never stop tracing that someone else (e.g. PYTHONTRACEMALLOC) started
+        if self._tracing_requests == 0 and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self._started_tracing = True
+        self._tracing_requests += 1
+
+        async def send_with_profile_id(message):
+            if message["type"] == "http.response.start":
+                profile.status_code = message["status"]
+                headers = list(message.get("headers", []))
+                headers.append((b"x-profile-id", profile.id.encode("latin-1")))
+                message = {**message, "headers": headers}
+            await send(message)
+
+        start_stacks = sampler.snapshot()
+        start_time = time.perf_counter()
+        try:
+            await app(scope, receive, send_with_profile_id)
+        finally:
+            stacks = sampler.snapshot() - start_stacks
+            del self._active_profiles[profile.id]
+            if not self._active_profiles:
+                sampler.stop()
+                self._sampler = None
+            profile.duration = time.perf_counter() - start_time
+            self._current.reset(token)
+            self._tracing_requests -= 1
+            if self._tracing_requests == 0 and self._started_tracing:
+                tracemalloc.stop()
+                self._started_tracing = False
+
+            profile.samples = sum(stacks.values())
+            # File I/O off the event loop, the blocking pattern this profiler exists to find.
+            # self.profiles is only touched on the loop thread, where summary() iterates it
+            await asyncio.to_thread(self._write_flamegraph, profile, collapsed_stacks(stacks))
+            dropped = self.profiles[0] if len(self.profiles) == self.profiles.maxlen else None
+            self.profiles.append(profile)
+            if dropped is not None and dropped.flamegraph_path:
+                await asyncio.to_thread(self._remove_flamegraph, dropped.flamegraph_path)
+
+    def _write_flamegraph(self, profile: RequestProfile, collapsed: str):
+        try:
+            os.makedirs(self.config.output_dir, exist_ok=True)
+            profile.flamegraph_path = os.path.join(self.config.output_dir, f"{profile.id}.folded")
+            with open(profile.flamegraph_path, "w") as f:
+                f.write(collapsed)
+        except Exception as e:
+            print(f"⚠️  Could not save profile: {e}")
+            profile.flamegraph_path = None
+
+    @staticmethod
+    def _remove_flamegraph(path: str):
+        if os.path.exists(path):
+            os.remove(path)
+
+    @contextmanager
+    def stage(self, name: str):
+        """Record wall time and peak traced memory for a pipeline stage of a profiled request"""
+        profile = self._current.get()
+        if profile is None or not tracemalloc.is_tracing():
+            yield
+            return
+
+        # The traced peak is process-wide: only the stage that starts while no other
+        # stage is running resets it, and any stages that overlap report no peak
+        record = {"stage": name, "overlapped": False}
+        with self._stage_lock:
+            if self._active_stages:
+                record["overlapped"] = True
+                for other in self._active_stages.values():
+                    other["overlapped"] = True
+            else:
+                tracemalloc.reset_peak()
+            self._active_stages[id(record)] = record
+            start_current, _ = tracemalloc.get_traced_memory()
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            with self._stage_lock:
+                del self._active_stages[id(record)]
+                current, peak = tracemalloc.get_traced_memory()
+            record["seconds"] = time.perf_counter() - start_time
+            record["peak_bytes"] = None if record["overlapped"] else max(0, peak - start_current)
+            record["retained_bytes"] = current - start_current
+            profile.stages.append(record)
+
+    def get_profile(self, profile_id: str) -> Optional[RequestProfile]:
+        for profile in self.profiles:
+            if profile.id == profile_id:
+                return profile
+        return None
+
+    def summary(self) -> dict:
+        return {
+            "config": self.config.to_dict(),
+            "event_loop_lag": self.loop_lag.stats(),
+            "note": ("Flame graphs sample the whole event loop thread: they include idle "
+                     "select() time while awaiting I/O, and the work of every request listed "
+                     "in overlapped_with"),
+            "profiles": [profile.to_dict() for profile in reversed(self.profiles)]
+        }
+
+
+class ProfilingMiddleware:
+    """
+    Plain ASGI middleware: requests that are not profiled are passed straight
+    through to the app, with no extra task or response wrapping.
+    """
+
+    def __init__(self, app, profiler: Profiler):
+        self.app = app
+        self.profiler = profiler
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not self.profiler.should_profile(scope):
+            await self.app(scope, receive, send)
+            return
+        await self.profiler.profile_asgi(self.app, scope, receive, send)
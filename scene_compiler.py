@@ -0,0 +1,670 @@
+import argparse
+import hashlib
+import io
+import json
+import os
+from typing import Optional
+
+import numpy as np
+import pygltflib
+import trimesh
+
+
+# Primitive sizes match loadPrimitiveModel() in js/export.js
+PRIMITIVE_SEGMENTS = 16
+CREASE_ANGLE = np.radians(30)
+
+# Repeated geometry below this count is merged instead of instanced
+MIN_INSTANCES = 2
+
+
+def _crease_normals(mesh: trimesh.Trimesh, angle: float = CREASE_ANGLE) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """
+    Split vertices along edges sharper than `angle` so primitives shade like
+    their three.js counterparts (flat box sides, smooth cylinder walls).
+    Returns (positions, normals, faces).
+    """
+    corners = mesh.faces.reshape(-1)
+    corner_normals = np.repeat(mesh.face_normals, 3, axis=0)
+
+    # Average the normals of faces around each corner that are within the crease angle
+    # (dense corner x corner comparison; primitives only have a few hundred faces)
+    shared = corners[:, None] == corners[None, :]
+    smooth = corner_normals @ corner_normals.T > np.cos(angle)
+    normals = (shared & smooth).astype(float) @ corner_normals
+    normals /= np.linalg.norm(normals, axis=1, keepdims=True)
+
+    keys = np.hstack([mesh.vertices[corners], normals]).round(6)
+    _, unique, inverse = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+    return mesh.vertices[corners][unique], normals[unique], inverse.reshape(-1, 3)
+
+
+def create_primitive(geometry_type: str) -> trimesh.Trimesh:
+    """Primitive mesh for an editor geometryType (three.js is Y-up, trimesh Z-up)"""
+    y_up = trimesh.transformations.rotation_matrix(-np.pi / 2, [1, 0, 0])
+    if geometry_type == 'SphereGeometry':
+        mesh = trimesh.creation.uv_sphere(radius=0.5, count=[PRIMITIVE_SEGMENTS, PRIMITIVE_SEGMENTS])
+    elif geometry_type == 'CylinderGeometry':
+        mesh = trimesh.creation.cylinder(radius=0.5, height=1, sections=PRIMITIVE_SEGMENTS)
+        mesh.apply_transform(y_up)
+    elif geometry_type == 'ConeGeometry':
+        mesh = trimesh.creation.cone(radius=0.5, height=1, sections=PRIMITIVE_SEGMENTS)
+        mesh.apply_translation([0, 0, -0.5])
+        mesh.apply_transform(y_up)
+    else:
+        mesh = trimesh.creation.box(extents=(1, 1, 1))
+    return mesh
+
+
+def object_matrix(model_data: dict) -> np.ndarray:
+    """Local matrix from editor position / rotation (Euler XYZ) / scale"""
+    position = model_data.get('position') or [0, 0, 0]
+    rotation = model_data.get('rotation') or [0, 0, 0]
+    scale = model_data.get('scale', 1)
+    if not isinstance(scale, (list, tuple)):
+        scale = [scale] * 3
+
+    matrix = trimesh.transformations.euler_matrix(*rotation, axes='rxyz')
+    matrix[:3, :3] = matrix[:3, :3] @ np.diag(scale)
+    matrix[:3, 3] = position
+    return matrix
+
+
+def primitive_material(props: dict) -> dict:
+    """Material record for an editor primitive (defaults match js/export.js)"""
+    color = props.get('color') or 'ffff00'
+    rgb = [int(color[i:i + 2], 16) / 255 for i in (0, 2, 4)]
+    emissive = props.get('emissive') or '000000'
+    return {
+        "baseColorFactor": rgb + [props.get('opacity', 1.0) if props.get('transparent') else 1.0],
+        "metallicFactor": float(props.get('metalness') or 0),
+        "roughnessFactor": float(props.get('roughness') or 1),
+        "emissiveFactor": [int(emissive[i:i + 2], 16) / 255 for i in (0, 2, 4)],
+        "alphaMode": "BLEND" if props.get('transparent') else "OPAQUE",
+        "image": None
+    }
+
+
+def trimesh_material(geometry: trimesh.Trimesh) -> dict:
+    """Material record for a mesh loaded from a GLB"""
+    material = {
+        "baseColorFactor": [1.0, 1.0, 1.0, 1.0],
+        "metallicFactor": 0.0,
+        "roughnessFactor": 1.0,
+        "emissiveFactor": [0.0, 0.0, 0.0],
+        "alphaMode": "OPAQUE",
+        "image": None
+    }
+    visual = geometry.visual
+    if isinstance(visual, trimesh.visual.TextureVisuals) and visual.material is not None:
+        pbr = visual.material
+        if isinstance(pbr, trimesh.visual.material.SimpleMaterial):
+            pbr = pbr.to_pbr()
+        if pbr.baseColorFactor is not None:
+            material["baseColorFactor"] = (np.asarray(pbr.baseColorFactor, dtype=float) / 255).tolist()
+        if pbr.metallicFactor is not None:
+            material["metallicFactor"] = float(pbr.metallicFactor)
+        if pbr.roughnessFactor is not None:
+            material["roughnessFactor"] = float(pbr.roughnessFactor)
+        if pbr.emissiveFactor is not None:
+            material["emissiveFactor"] = [float(c) for c in pbr.emissiveFactor]
+        if pbr.alphaMode:
+            material["alphaMode"] = pbr.alphaMode
+        material["image"] = pbr.baseColorTexture
+    elif visual is not None and visual.kind is not None:
+        material["baseColorFactor"] = (np.asarray(visual.main_color, dtype=float) / 255).tolist()
+    return material
+
+
+def apply_material_overrides(material: dict, props: dict) -> dict:
+    """Editor material edits applied on top of a GLB material, as loadGLBModel() in js/export.js does"""
+    material = dict(material)
+    if props.get('color'):
+        color = props['color']
+        material["baseColorFactor"] = [int(color[i:i + 2], 16) / 255 for i in (0, 2, 4)] + \
+            [material["baseColorFactor"][3]]
+    if props.get('transparent') and props.get('opacity') is not None:
+        material["baseColorFactor"] = material["baseColorFactor"][:3] + [float(props['opacity'])]
+        material["alphaMode"] = "BLEND"
+    if props.get('emissive'):
+        emissive = props['emissive']
+        material["emissiveFactor"] = [int(emissive[i:i + 2], 16) / 255 for i in (0, 2, 4)]
+    if props.get('metalness') is not None:
+        material["metallicFactor"] = float(props['metalness'])
+    if props.get('roughness') is not None:
+        material["roughnessFactor"] = float(props['roughness'])
+    return material
+
+
+def material_key(material: dict) -> tuple:
+    image = material["image"]
+    image_hash = hashlib.sha1(image.tobytes()).hexdigest() if image is not None else None
+    return (
+        tuple(round(c, 4) for c in material["baseColorFactor"]),
+        round(material["metallicFactor"], 4),
+        round(material["roughnessFactor"], 4),
+        tuple(round(c, 4) for c in material["emissiveFactor"]),
+        material["alphaMode"],
+        image_hash
+    )
+
+
+def make_part(positions, normals, faces, uv, material: dict, matrix: np.ndarray,
+              key: Optional[tuple] = None) -> dict:
+    """
+    A single draw: local geometry, its material and its world matrix (normals may be None).
+    Pass `key` to reuse an already computed material_key() instead of hashing the texture again.
+    """
+    positions = np.asarray(positions, dtype=np.float32)
+    faces = np.asarray(faces, dtype=np.uint32)
+    uv = np.asarray(uv, dtype=np.float32) if uv is not None and material["image"] is not None else None
+
+    digest = hashlib.sha1()
+    for array in (positions.round(5), faces, uv.round(5) if uv is not None else None):
+        if array is not None:
+            digest.update(np.ascontiguousarray(array).tobytes())
+
+    return {
+        "positions": positions,
+        "normals": np.asarray(normals, dtype=np.float32) if normals is not None else None,
+        "faces": faces,
+        "uv": uv,
+        "material": material,
+        "material_key": key if key is not None else material_key(material),
+        "geometry_key": digest.hexdigest(),
+        "matrix": np.asarray(matrix, dtype=float)
+    }
+
+
+def _component_labels(faces: np.ndarray, vertex_count: int) -> np.ndarray:
+    """
+    Connected component label (the smallest vertex index) for each vertex.
+    Vectorized union-find: hook each root under the smallest root it shares a
+    face with, then compress paths, until every face has a single label.
+    """
+    labels = np.arange(vertex_count)
+    edges = np.vstack([faces[:, [0, 1]], faces[:, [1, 2]]])
+    while True:
+        a, b = labels[edges[:, 0]], labels[edges[:, 1]]
+        differ = a != b
+        if not differ.any():
+            return labels
+        np.minimum.at(labels, np.maximum(a, b)[differ], np.minimum(a, b)[differ])
+        while True:
+            jumped = labels[labels]
+            if np.array_equal(jumped, labels):
+                break
+            labels = jumped
+
+
+def split_repeated_components(part: dict) -> list[dict]:
+    """
+    Split a part into connected components and re-express components that are
+    translated copies of each other (e.g. the four wheels of
+    create_detailed_car) as one geometry placed by several matrices.
+    """
+    faces = part["faces"]
+    roots = _component_labels(faces, len(part["positions"]))[faces[:, 0]]
+    order = np.argsort(roots, kind='stable')
+    boundaries = np.flatnonzero(np.diff(roots[order])) + 1
+    if len(boundaries) == 0:
+        return [part]
+    components = np.split(faces[order], boundaries)
+
+    pieces = []
+    for component_faces in components:
+        used, local_faces = np.unique(component_faces, return_inverse=True)
+        local_faces = local_faces.reshape(-1, 3)
+        positions = part["positions"][used]
+        offset = positions.min(axis=0)
+        translation = np.identity(4)
+        translation[:3, 3] = offset
+        pieces.append((component_faces, make_part(
+            positions - offset,
+            part["normals"][used] if part["normals"] is not None else None,
+            local_faces,
+            part["uv"][used] if part["uv"] is not None else None,
+            part["material"],
+            part["matrix"] @ translation,
+            part["material_key"]
+        )))
+
+    counts = {}
+    for _, piece in pieces:
+        counts[piece["geometry_key"]] = counts.get(piece["geometry_key"], 0) + 1
+    repeated = [piece for _, piece in pieces if counts[piece["geometry_key"]] >= MIN_INSTANCES]
+    if not repeated:
+        return [part]
+
+    # Components that only appear once stay together in the original part
+    rest = [faces for faces, piece in pieces if counts[piece["geometry_key"]] < MIN_INSTANCES]
+    if rest:
+        rest_faces = np.vstack(rest)
+        used, local_faces = np.unique(rest_faces, return_inverse=True)
+        repeated.append(make_part(
+            part["positions"][used],
+            part["normals"][used] if part["normals"] is not None else None,
+            local_faces.reshape(-1, 3),
+            part["uv"][used] if part["uv"] is not None else None,
+            part["material"],
+            part["matrix"],
+            part["material_key"]
+        ))
+    return repeated
+
+
+def load_model_parts(model_data: dict, assets_dir: str,
+                     cache: dict = None) -> tuple[list[dict], Optional[str], int]:
+    """
+    Parts for one editor model, the asset file the editor would fetch for it,
+    and the number of draw calls the editor issues for it today.
+    """
+    matrix = object_matrix(model_data)
+    source_file = model_data.get('sourceFile')
+
+    if not source_file or not source_file.lower().endswith('.glb'):
+        mesh = create_primitive(model_data.get('geometryType', 'BoxGeometry'))
+        positions, normals, faces = _crease_normals(mesh)
+        material = primitive_material(model_data.get('material') or {})
+        return [make_part(positions, normals, faces, None, material, matrix)], None, 1
+
+    path = os.path.join(assets_dir, source_file)
+    cache = cache if cache is not None else {}
+    if path not in cache:
+        cache[path] = trimesh.load(path, force='scene', process=False)
+    scene = cache[path]
+    nodes = [node for node in scene.graph.nodes_geometry
+             if isinstance(scene.geometry[scene.graph[node][1]], trimesh.Trimesh)
+             and len(scene.geometry[scene.graph[node][1]].faces) > 0]
+    if model_data.get('isGLBPart'):
+        name = model_data.get('name')
+        matching = [node for node in nodes if name in (node, scene.graph[node][1])]
+        if not matching and nodes:
+            # Same fallback as loadGLBModel() in js/export.js: use the first mesh
+            print(f"⚠️  No mesh named '{name}' in {source_file}, using the first mesh")
+            matching = nodes[:1]
+        nodes = matching
+    if not nodes:
+        print(f"⚠️  No meshes found for model '{model_data.get('name')}' in {source_file}")
+
+    parts = []
+    draw_calls = 0
+    for node in nodes:
+        transform, geometry_name = scene.graph[node]
+        geometry = scene.geometry[geometry_name]
+        uv = getattr(geometry.visual, 'uv', None)
+        # Only keep normals the file provides; computing them adds bytes and (without scipy) minutes
+        normals = geometry.vertex_normals if 'vertex_normals' in geometry._cache else None
+        material = trimesh_material(geometry)
+        if model_data.get('isGLBPart'):
+            # export.js only applies material edits to GLB parts
+            material = apply_material_overrides(material, model_data.get('material') or {})
+        # isGLBPart meshes are placed directly by the editor transform
+        node_matrix = matrix if model_data.get('isGLBPart') else matrix @ transform
+        part = make_part(geometry.vertices, normals, geometry.faces, uv, material, node_matrix)
+        parts.extend(split_repeated_components(part))
+        draw_calls += 1
+    return parts, path, draw_calls
+
+
+def scene_models(scene: dict) -> list[dict]:
+    """Editor models, including the legacy top-level `box` entry of scene.json"""
+    models = list(scene.get('models', []))
+    box = scene.get('box')
+    if box:
+        models.append({
+            "id": "box",
+            "name": "Box",
+            "geometryType": "BoxGeometry",
+            "position": box.get('position'),
+            "rotation": box.get('rotation'),
+            "scale": box.get('scale', 1),
+            "material": {"color": box.get('color')}
+        })
+    return models
+
+
+def _decompose(matrix: np.ndarray) -> Optional[tuple[list, list, list]]:
+    """TRS for a matrix, or None if it has shear and cannot be instanced"""
+    scale, shear, angles, translation, _ = trimesh.transformations.decompose_matrix(matrix)
+    if not np.allclose(shear, 0, atol=1e-6):
+        return None
+    quaternion = trimesh.transformations.quaternion_from_euler(*angles, axes='sxyz')
+    # trimesh quaternions are (w, x, y, z); glTF wants (x, y, z, w)
+    rotation = [quaternion[1], quaternion[2], quaternion[3], quaternion[0]]
+    return list(translation), rotation, list(scale)
+
+
+def bake_primitives(parts: list[dict], base_matrix: Optional[np.ndarray] = None) -> list[dict]:
+    """
+    Transform parts into the space of `base_matrix` (world space if None) and
+    merge them into one primitive per material.
+    """
+    inverse_base = np.linalg.inv(base_matrix) if base_matrix is not None else np.identity(4)
+    groups = {}
+    for part in parts:
+        # Parts without normals cannot share a primitive with parts that have them
+        groups.setdefault((part["material_key"], part["normals"] is not None), []).append(part)
+
+    primitives = []
+    for (key, has_normals), batch in groups.items():
+        positions, normals, faces, uvs = [], [], [], []
+        offset = 0
+        for part in batch:
+            matrix = inverse_base @ part["matrix"]
+            positions.append(trimesh.transform_points(part["positions"], matrix))
+            if has_normals:
+                normal_matrix = np.linalg.inv(matrix[:3, :3]).T
+                baked_normals = part["normals"] @ normal_matrix.T
+                baked_normals /= np.maximum(np.linalg.norm(baked_normals, axis=1, keepdims=True), 1e-12)
+                normals.append(baked_normals)
+            if np.linalg.det(matrix[:3, :3]) < 0:
+                faces.append(part["faces"][:, ::-1] + offset)
+            else:
+                faces.append(part["faces"] + offset)
+            uvs.append(part["uv"])
+            offset += len(part["positions"])
+        primitives.append({
+            "positions": np.vstack(positions).astype(np.float32),
+            "normals": np.vstack(normals).astype(np.float32) if has_normals else None,
+            "faces": np.vstack(faces).astype(np.uint32),
+            "uv": np.vstack(uvs) if all(uv is not None for uv in uvs) else None,
+            "material": batch[0]["material"],
+            "material_key": key
+        })
+    return primitives
+
+
+class GLBWriter:
+    """Accumulates meshes, materials and nodes into a single binary glTF"""
+
+    def __init__(self):
+        self.gltf = pygltflib.GLTF2(asset=pygltflib.Asset(generator="scene_compiler.py"))
+        self.gltf.scenes = [pygltflib.Scene(nodes=[])]
+        self.gltf.scene = 0
+        self.blob = bytearray()
+        self.materials = {}
+
+    def _add_view(self, data: bytes, target: Optional[int] = None) -> int:
+        while len(self.blob) % 4:
+            self.blob.append(0)
+        view = pygltflib.BufferView(buffer=0, byteOffset=len(self.blob), byteLength=len(data), target=target)
+        self.blob.extend(data)
+        self.gltf.bufferViews.append(view)
+        return len(self.gltf.bufferViews) - 1
+
+    def _add_accessor(self, array: np.ndarray, accessor_type: str, target: Optional[int] = None,
+                      with_bounds: bool = False) -> int:
+        component_type = {
+            np.dtype(np.float32): pygltflib.FLOAT,
+            np.dtype(np.uint16): pygltflib.UNSIGNED_SHORT,
+            np.dtype(np.uint32): pygltflib.UNSIGNED_INT
+        }[array.dtype]
+        accessor = pygltflib.Accessor(
+            bufferView=self._add_view(np.ascontiguousarray(array).tobytes(), target),
+            componentType=component_type,
+            count=len(array),
+            type=accessor_type
+        )
+        if with_bounds:
+            accessor.min = array.min(axis=0).tolist()
+            accessor.max = array.max(axis=0).tolist()
+        self.gltf.accessors.append(accessor)
+        return len(self.gltf.accessors) - 1
+
+    def add_material(self, material: dict, key: tuple) -> int:
+        if key in self.materials:
+            return self.materials[key]
+
+        pbr = pygltflib.PbrMetallicRoughness(
+            baseColorFactor=[float(c) for c in material["baseColorFactor"]],
+            metallicFactor=material["metallicFactor"],
+            roughnessFactor=material["roughnessFactor"]
+        )
+        if material["image"] is not None:
+            # Keep JPEG textures as JPEG; re-encoding them as PNG would inflate the file
+            image_format = 'JPEG' if material["image"].format == 'JPEG' else 'PNG'
+            encoded = io.BytesIO()
+            material["image"].save(encoded, format=image_format)
+            self.gltf.images.append(pygltflib.Image(bufferView=self._add_view(encoded.getvalue()),
+                                                    mimeType=f"image/{image_format.lower()}"))
+            if not self.gltf.samplers:
+                self.gltf.samplers.append(pygltflib.Sampler())
+            self.gltf.textures.append(pygltflib.Texture(sampler=0, source=len(self.gltf.images) - 1))
+            pbr.baseColorTexture = pygltflib.TextureInfo(index=len(self.gltf.textures) - 1)
+
+        self.gltf.materials.append(pygltflib.Material(
+            pbrMetallicRoughness=pbr,
+            emissiveFactor=material["emissiveFactor"],
+            alphaMode=material["alphaMode"]
+        ))
+        self.materials[key] = len(self.gltf.materials) - 1
+        return self.materials[key]
+
+    def add_mesh(self, name: str, primitives: list[dict]) -> int:
+        """primitives: dicts with positions, normals, faces, uv, material, material_key"""
+        gltf_primitives = []
+        for primitive in primitives:
+            attributes = pygltflib.Attributes(
+                POSITION=self._add_accessor(primitive["positions"], pygltflib.VEC3, pygltflib.ARRAY_BUFFER, True)
+            )
+            if primitive["normals"] is not None:
+                attributes.NORMAL = self._add_accessor(primitive["normals"], pygltflib.VEC3, pygltflib.ARRAY_BUFFER)
+            if primitive["uv"] is not None:
+                # trimesh flips V on load (uv[:, 1] = 1 - uv[:, 1]); flip it back as trimesh's exporter does
+                uv = primitive["uv"].copy()
+                uv[:, 1] = 1 - uv[:, 1]
+                attributes.TEXCOORD_0 = self._add_accessor(uv, pygltflib.VEC2, pygltflib.ARRAY_BUFFER)
+            index_type = np.uint16 if len(primitive["positions"]) < 65536 else np.uint32
+            indices = primitive["faces"].astype(index_type).reshape(-1)
+            gltf_primitives.append(pygltflib.Primitive(
+                attributes=attributes,
+                indices=self._add_accessor(indices, pygltflib.SCALAR, pygltflib.ELEMENT_ARRAY_BUFFER),
+                material=self.add_material(primitive["material"], primitive["material_key"])
+            ))
+        self.gltf.meshes.append(pygltflib.Mesh(name=name, primitives=gltf_primitives))
+        return len(self.gltf.meshes) - 1
+
+    def add_node(self, name: str, mesh: int, matrix: Optional[np.ndarray] = None,
+                 instances: Optional[list[tuple]] = None) -> int:
+        node = pygltflib.Node(name=name, mesh=mesh)
+        if matrix is not None and not np.allclose(matrix, np.identity(4)):
+            # glTF matrices are column-major
+            node.matrix = [float(v) for v in np.asarray(matrix).T.reshape(-1)]
+        if instances:
+            attributes = {}
+            for index, (attribute, accessor_type) in enumerate(
+                    [("TRANSLATION", pygltflib.VEC3), ("ROTATION", pygltflib.VEC4), ("SCALE", pygltflib.VEC3)]):
+                values = np.array([instance[index] for instance in instances], dtype=np.float32)
+                attributes[attribute] = self._add_accessor(values, accessor_type)
+            node.extensions = {"EXT_mesh_gpu_instancing": {"attributes": attributes}}
+            if "EXT_mesh_gpu_instancing" not in self.gltf.extensionsUsed:
+                self.gltf.extensionsUsed.append("EXT_mesh_gpu_instancing")
+        self.gltf.nodes.append(node)
+        self.gltf.scenes[0].nodes.append(len(self.gltf.nodes) - 1)
+        return len(self.gltf.nodes) - 1
+
+    def save(self, output_path: str) -> int:
+        while len(self.blob) % 4:
+            self.blob.append(0)
+        self.gltf.buffers = [pygltflib.Buffer(byteLength=len(self.blob))]
+        self.gltf.set_binary_blob(bytes(self.blob))
+        self.gltf.save_binary(output_path)
+        return os.path.getsize(output_path)
+
+
+def _read_accessor(gltf: pygltflib.GLTF2, blob: bytes, index: int) -> np.ndarray:
+    """Raw accessor values as a (count, width) float array"""
+    accessor = gltf.accessors[index]
+    view = gltf.bufferViews[accessor.bufferView]
+    dtype = np.dtype({
+        pygltflib.FLOAT: np.float32,
+        pygltflib.UNSIGNED_BYTE: np.uint8,
+        pygltflib.UNSIGNED_SHORT: np.uint16,
+        pygltflib.UNSIGNED_INT: np.uint32
+    }[accessor.componentType])
+    width = {pygltflib.SCALAR: 1, pygltflib.VEC2: 2, pygltflib.VEC3: 3, pygltflib.VEC4: 4}[accessor.type]
+    values = np.ndarray(
+        shape=(accessor.count, width),
+        dtype=dtype,
+        buffer=blob,
+        offset=(view.byteOffset or 0) + (accessor.byteOffset or 0),
+        strides=(view.byteStride or dtype.itemsize * width, dtype.itemsize)
+    ).astype(float)
+    if accessor.normalized:
+        values /= np.iinfo(dtype).max
+    return values
+
+
+def _raw_texcoords(path: str) -> np.ndarray:
+    """Every TEXCOORD_0 value stored in a GLB, exactly as written (no loader flips)"""
+    gltf = pygltflib.GLTF2().load(path)
+    blob = gltf.binary_blob()
+    texcoords = [_read_accessor(gltf, blob, primitive.attributes.TEXCOORD_0)
+                 for mesh in gltf.meshes for primitive in mesh.primitives
+                 if primitive.attributes.TEXCOORD_0 is not None]
+    return np.vstack(texcoords) if texcoords else np.zeros((0, 2))
+
+
+def check_texcoords(source_files: list, output_path: str, tolerance: float = 1e-4) -> bool:
+    """Round-trip check: every source TEXCOORD_0 value must appear unchanged in the compiled GLB"""
+    # Two grids offset by half a cell, so float noise at a cell edge cannot cause a false mismatch
+    output = _raw_texcoords(output_path) / tolerance
+    grids = [set(map(tuple, np.floor(output + shift).astype(np.int64).tolist())) for shift in (0, 0.5)]
+    ok = True
+    for path in source_files:
+        source = _raw_texcoords(path) / tolerance
+        keys = [np.floor(source + shift).astype(np.int64).tolist() for shift in (0, 0.5)]
+        missing = sum(1 for a, b in zip(*keys) if tuple(a) not in grids[0] and tuple(b) not in grids[1])
+        if missing:
+            print(f"⚠️  {missing:,} TEXCOORD_0 values from {path} changed in {output_path}")
+            ok = False
+    return ok
+
+
+def compile_scene(scene: dict, output_path: str, assets_dir: str = "assets",
+                  editable_ids: set = None) -> tuple[dict, dict]:
+    """
+    Statically batch an editor scene into one GLB.
+
+    - repeated geometry (same mesh and material) becomes one EXT_mesh_gpu_instancing node
+    - remaining static parts are transformed to world space and merged per material
+    - editable objects (`editable: true`, a script, or listed in editable_ids) are never
+      instanced or merged; each becomes one node carrying its editor transform
+
+    Returns (remap table, stats). The remap table maps every model id to the
+    nodes that now draw it: {"node", "instance" (index or None), "merged"}.
+    """
+    editable_ids = set(editable_ids or [])
+    models = scene_models(scene)
+    parts = []
+    # The editor calls loader.load() once per GLB model, so every model is a fetch
+    fetched_files = []
+    draw_calls_before = 0
+    cache = {}
+
+    editable_models = {}
+
+    for model_data in models:
+        model_id = model_data.get('id') or model_data.get('name')
+        editable = bool(model_data.get('editable') or model_data.get('script') or model_id in editable_ids)
+        model_parts, source_file, draw_calls = load_model_parts(model_data, assets_dir, cache)
+        if editable:
+            editable_models[model_id] = (object_matrix(model_data), model_parts)
+        if source_file:
+            fetched_files.append(source_file)
+        draw_calls_before += draw_calls
+        for part in model_parts:
+            part["model_id"] = model_id
+            part["source_file"] = source_file
+            part["editable"] = editable
+        parts.extend(model_parts)
+
+    # Editable models are kept whole, one node each; only static parts are instanced or merged
+    batches = {}
+    for part in parts:
+        if part["editable"]:
+            continue
+        batches.setdefault((part["geometry_key"], part["material_key"]), []).append(part)
+
+    writer = GLBWriter()
+    remap = {}
+    merged = []
+
+    for model_id, (model_matrix, model_parts) in editable_models.items():
+        if not model_parts:
+            continue
+        # Bake parts into the model's local space so the node carries the editor transform
+        mesh = writer.add_mesh(model_id, bake_primitives(model_parts, model_matrix))
+        node = writer.add_node(model_id, mesh, matrix=model_matrix)
+        remap[model_id] = [{"node": node, "instance": None, "merged": False}]
+
+    for (geometry_key, _), batch in batches.items():
+        trs = [_decompose(part["matrix"]) for part in batch]
+        if len(batch) < MIN_INSTANCES or any(t is None for t in trs):
+            merged.extend(batch)
+            continue
+
+        mesh = writer.add_mesh(f"instanced_{geometry_key[:8]}", [batch[0]])
+        node = writer.add_node(f"instanced_{geometry_key[:8]}", mesh, instances=trs)
+        for index, part in enumerate(batch):
+            remap.setdefault(part["model_id"], []).append(
+                {"node": node, "instance": index, "merged": False})
+
+    if merged:
+        # One primitive per material in a single static mesh
+        node = writer.add_node("static_merged", writer.add_mesh("static_merged", bake_primitives(merged)))
+        for part in merged:
+            entry = {"node": node, "instance": None, "merged": True}
+            entries = remap.setdefault(part["model_id"], [])
+            if entry not in entries:
+                entries.append(entry)
+
+    bytes_after = writer.save(output_path)
+    textured_files = sorted({part["source_file"] for part in parts if part["uv"] is not None and part["source_file"]})
+    draw_calls_after = sum(len(mesh.primitives) for mesh in writer.gltf.meshes)
+
+    stats = {
+        "objects": len(models),
+        "draw_calls_before": draw_calls_before,
+        "draw_calls_after": draw_calls_after,
+        "fetches_before": len(fetched_files),
+        "fetches_after": 1,
+        "bytes_before": sum(os.path.getsize(path) for path in fetched_files),
+        "bytes_after": bytes_after,
+        "texcoords_match": check_texcoords(textured_files, output_path)
+    }
+
+    # Merged parts can no longer move on their own; instanced parts can via their instance index
+    remap_table = {"glb": os.path.basename(output_path), "objects": remap}
+    return remap_table, stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compile an editor scene into one instanced, merged GLB")
+    parser.add_argument("scene", help="scene.json exported by the editor")
+    parser.add_argument("-o", "--output", default="scene_compiled.glb")
+    parser.add_argument("--assets", default="assets", help="Directory GLB sourceFile paths are relative to")
+    parser.add_argument("--editable", default="", help="Comma-separated model ids to keep as separate nodes")
+    args = parser.parse_args()
+
+    with open(args.scene) as f:
+        scene = json.load(f)
+
+    editable_ids = {i for i in args.editable.split(',') if i}
+    remap_table, stats = compile_scene(scene, args.output, args.assets, editable_ids)
+
+    remap_path = os.path.splitext(args.output)[0] + ".remap.json"
+    with open(remap_path, 'w') as f:
+        json.dump(remap_table, f, indent=2)
+
+    print(f"✅ Wrote {args.output} and {remap_path}")
+    print(f"📊 {stats['objects']} objects")
+    print(f"🎨 Draw calls: {stats['draw_calls_before']} → {stats['draw_calls_after']}")
+    print(f"🌐 Fetches:    {stats['fetches_before']} → {stats['fetches_after']}")
+    print(f"💾 Bytes:      {stats['bytes_before']:,} → {stats['bytes_after']:,}")
+    print(f"🧭 Texture coordinates: {'match the source GLBs' if stats['texcoords_match'] else 'CHANGED, see warnings above'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,417 @@
+import argparse
+import json
+import math
+import os
+import random
+import time
+from typing import Optional
+
+import numpy as np
+
+
+# Keep these in sync with js/main3.js
+DEFAULT_CHUNK_WORLD_SIZE = 1.0
+DEFAULT_LOD_DISTANCES = {"high": 5.0, "med": 10.0, "low": 20.0}
+LOD_ORDER = ["low", "med", "high"]
+
+MANIFEST_VERSION = 2
+
+OUTSIDE, INTERSECTS, INSIDE = 0, 1, 2
+
+
+def read_ply_vertex_count(path: str) -> int:
+    """Read the splat count from a PLY header without loading the body"""
+    with open(path, 'rb') as f:
+        for raw in f:
+            line = raw.decode('ascii', errors='ignore').strip()
+            if line.startswith('element vertex'):
+                return int(line.split()[-1])
+            if line == 'end_header':
+                break
+    return 0
+
+
+def frustum_planes_from_matrix(view_projection: np.ndarray) -> list[tuple[float, float, float, float]]:
+    """
+    Extract the six frustum planes from a 4x4 projection @ view matrix.
+
+    Planes are (nx, ny, nz, d) with the normal pointing inwards, so a point p is
+    inside when nx*px + ny*py + nz*pz + d >= 0 (same convention as THREE.Frustum).
+    """
+    m = np.asarray(view_projection, dtype=float)
+    rows = [m[3] + m[0], m[3] - m[0], m[3] + m[1], m[3] - m[1], m[3] + m[2], m[3] - m[2]]
+    planes = []
+    for row in rows:
+        length = np.linalg.norm(row[:3])
+        row = row / length
+        planes.append((float(row[0]), float(row[1]), float(row[2]), float(row[3])))
+    return planes
+
+
+def perspective_frustum_planes(position, target, up=(0, 1, 0), fov: float = 65.0,
+                               aspect: float = 16 / 9, near: float = 0.1,
+                               far: float = 1000.0) -> list[tuple[float, float, float, float]]:
+    """Frustum planes for a look-at perspective camera (defaults match js/main3.js)"""
+    eye = np.asarray(position, dtype=float)
+    forward = np.asarray(target, dtype=float) - eye
+    forward /= np.linalg.norm(forward)
+    side = np.cross(forward, np.asarray(up, dtype=float))
+    side /= np.linalg.norm(side)
+    true_up = np.cross(side, forward)
+
+    view = np.identity(4)
+    view[0, :3] = side
+    view[1, :3] = true_up
+    view[2, :3] = -forward
+    view[:3, 3] = -view[:3, :3] @ eye
+
+    f = 1.0 / math.tan(math.radians(fov) / 2)
+    projection = np.zeros((4, 4))
+    projection[0, 0] = f / aspect
+    projection[1, 1] = f
+    projection[2, 2] = (far + near) / (near - far)
+    projection[2, 3] = 2 * far * near / (near - far)
+    projection[3, 2] = -1.0
+
+    return frustum_planes_from_matrix(projection @ view)
+
+
+def sphere_in_frustum(center, radius: float, planes) -> bool:
+    for nx, ny, nz, d in planes:
+        if nx * center[0] + ny * center[1] + nz * center[2] + d < -radius:
+            return False
+    return True
+
+
+def classify_box(box_min, box_max, planes) -> int:
+    """AABB vs frustum: OUTSIDE, INTERSECTS, or INSIDE (no plane needs testing below it)"""
+    result = INSIDE
+    for nx, ny, nz, d in planes:
+        # Corners furthest along and against the plane normal
+        if nx >= 0:
+            px, qx = box_max[0], box_min[0]
+        else:
+            px, qx = box_min[0], box_max[0]
+        if ny >= 0:
+            py, qy = box_max[1], box_min[1]
+        else:
+            py, qy = box_min[1], box_max[1]
+        if nz >= 0:
+            pz, qz = box_max[2], box_min[2]
+        else:
+            pz, qz = box_min[2], box_max[2]
+        if nx * px + ny * py + nz * pz + d < 0:
+            return OUTSIDE
+        if nx * qx + ny * qy + nz * qz + d < 0:
+            result = INTERSECTS
+    return result
+
+
+def box_distance(box_min, box_max, point) -> float:
+    """Distance from a point to the closest point of an AABB (0 if inside)"""
+    total = 0.0
+    for axis in range(3):
+        if point[axis] < box_min[axis]:
+            delta = box_min[axis] - point[axis]
+        elif point[axis] > box_max[axis]:
+            delta = point[axis] - box_max[axis]
+        else:
+            continue
+        total += delta * delta
+    return math.sqrt(total)
+
+
+def desired_lod(distance: float, lod_distances: dict = None) -> Optional[str]:
+    """Pick the LOD for a visible chunk at the given camera distance"""
+    lod_distances = lod_distances or DEFAULT_LOD_DISTANCES
+    for lod in reversed(LOD_ORDER):
+        if distance < lod_distances[lod]:
+            return lod
+    return None
+
+
+def group_manifest_entries(entries: list, chunk_dir: str = None) -> list[dict]:
+    """Group flat manifest entries (one per chunk and LOD) into chunks"""
+    chunks = {}
+    for entry in entries:
+        key = (entry['i'], entry['j'], entry['k'])
+        chunk = chunks.get(key)
+        if chunk is None:
+            chunk = {
+                "i": entry['i'],
+                "j": entry['j'],
+                "k": entry['k'],
+                "center": [float(c) for c in entry['center']],
+                "splats": {}
+            }
+            chunks[key] = chunk
+
+        count = entry.get('splat_count')
+        if count is None and chunk_dir:
+            path = os.path.join(chunk_dir, entry['filename'])
+            if path.endswith('.ply') and os.path.exists(path):
+                count = read_ply_vertex_count(path)
+        chunk["splats"][entry['lod']] = int(count or 0)
+
+    return list(chunks.values())
+
+
+class SplatChunkOctree:
+    """
+    Octree over splat chunks for frustum culling and LOD prioritization.
+
+    Every node stores the bounds of its chunks' bounding spheres, so a node that
+    fails a frustum test can be skipped together with its whole subtree.
+    """
+
+    def __init__(self, chunks: list[dict], chunk_world_size: float = DEFAULT_CHUNK_WORLD_SIZE,
+                 leaf_size: int = 8, max_depth: int = 12):
+        self.chunks = chunks
+        self.chunk_world_size = chunk_world_size
+        self.chunk_radius = math.sqrt(3) * chunk_world_size * 0.5
+        self.leaf_size = leaf_size
+        self.max_depth = max_depth
+        self.root = self._build(list(range(len(chunks))), 0) if chunks else None
+
+    def _build(self, indices: list[int], depth: int) -> dict:
+        centers = np.array([self.chunks[i]['center'] for i in indices], dtype=float)
+        lo = centers.min(axis=0)
+        hi = centers.max(axis=0)
+
+        splats = {}
+        for i in indices:
+            for lod, count in self.chunks[i]['splats'].items():
+                splats[lod] = splats.get(lod, 0) + count
+
+        node = {
+            "min": (lo - self.chunk_radius).tolist(),
+            "max": (hi + self.chunk_radius).tolist(),
+            "chunks": len(indices),
+            "splats": splats
+        }
+
+        if len(indices) <= self.leaf_size or depth >= self.max_depth or np.allclose(lo, hi):
+            node["items"] = indices
+            return node
+
+        # Split at the midpoint of the chunk centers into up to 8 octants
+        mid = (lo + hi) / 2
+        octants = {}
+        for index, center in zip(indices, centers):
+            key = (center[0] > mid[0], center[1] > mid[1], center[2] > mid[2])
+            octants.setdefault(key, []).append(index)
+
+        node["children"] = [self._build(octants[key], depth + 1) for key in sorted(octants)]
+        return node
+
+    @classmethod
+    def from_manifest(cls, manifest, **kwargs) -> 'SplatChunkOctree':
+        """Load from a hierarchical manifest, or build one from a flat manifest"""
+        if isinstance(manifest, list):
+            return cls(group_manifest_entries(manifest), **kwargs)
+        if 'octree' not in manifest:
+            # {"entries": [...]}, the same flat shape build_manifest() accepts
+            if 'chunk_world_size' in manifest:
+                kwargs.setdefault('chunk_world_size', manifest['chunk_world_size'])
+            return cls(group_manifest_entries(manifest['entries']), **kwargs)
+
+        tree = cls.__new__(cls)
+        tree.chunks = manifest['chunks']
+        tree.chunk_world_size = manifest.get('chunk_world_size', DEFAULT_CHUNK_WORLD_SIZE)
+        tree.chunk_radius = math.sqrt(3) * tree.chunk_world_size * 0.5
+        tree.leaf_size = kwargs.get('leaf_size', 8)
+        tree.max_depth = kwargs.get('max_depth', 12)
+        tree.root = manifest.get('octree')
+        return tree
+
+    def to_manifest(self, entries: list) -> dict:
+        """Hierarchical manifest: the flat entries plus chunk list and octree"""
+        return {
+            "version": MANIFEST_VERSION,
+            "chunk_world_size": self.chunk_world_size,
+            "entries": entries,
+            "chunks": self.chunks,
+            "octree": self.root
+        }
+
+    def node_count(self) -> int:
+        count = 0
+        stack = [self.root] if self.root else []
+        while stack:
+            node = stack.pop()
+            count += 1
+            stack.extend(node.get('children', []))
+        return count
+
+    def query_frustum(self, planes) -> list[int]:
+        """Indices of all chunks whose bounding sphere intersects the frustum"""
+        visible = []
+        stack = [(self.root, INTERSECTS)] if self.root else []
+        while stack:
+            node, state = stack.pop()
+            if state != INSIDE:
+                state = classify_box(node['min'], node['max'], planes)
+                if state == OUTSIDE:
+                    continue
+            if 'items' in node:
+                for i in node['items']:
+                    if state == INSIDE or sphere_in_frustum(self.chunks[i]['center'], self.chunk_radius, planes):
+                        visible.append(i)
+            else:
+                stack.extend((child, state) for child in node['children'])
+        return visible
+
+    def prioritize(self, camera_position, planes=None,
+                   lod_distances: dict = None) -> list[tuple[float, int, str]]:
+        """
+        Visible chunks within LOD range as (distance, chunk index, desired LOD),
+        nearest first. Subtrees outside the frustum or beyond the furthest LOD
+        distance are skipped without visiting their chunks.
+        """
+        lod_distances = lod_distances or DEFAULT_LOD_DISTANCES
+        max_distance = max(lod_distances.values())
+        result = []
+        stack = [(self.root, INTERSECTS if planes is not None else INSIDE)] if self.root else []
+        while stack:
+            node, state = stack.pop()
+            if box_distance(node['min'], node['max'], camera_position) >= max_distance:
+                continue
+            if state != INSIDE:
+                state = classify_box(node['min'], node['max'], planes)
+                if state == OUTSIDE:
+                    continue
+            if 'items' in node:
+                for i in node['items']:
+                    center = self.chunks[i]['center']
+                    distance = math.dist(camera_position, center)
+                    if distance >= max_distance:
+                        continue
+                    if state != INSIDE and not sphere_in_frustum(center, self.chunk_radius, planes):
+                        continue
+                    result.append((distance, i, desired_lod(distance, lod_distances)))
+            else:
+                stack.extend((child, state) for child in node['children'])
+        result.sort()
+        return result
+
+
+def flat_prioritize(chunks: list[dict], chunk_radius: float, camera_position, planes=None,
+                    lod_distances: dict = None) -> list[tuple[float, int, str]]:
+    """Reference implementation of prioritize() scanning every chunk, as js/main3.js used to"""
+    result = []
+    for i, chunk in enumerate(chunks):
+        center = chunk['center']
+        if planes is not None and not sphere_in_frustum(center, chunk_radius, planes):
+            continue
+        distance = math.dist(camera_position, center)
+        lod = desired_lod(distance, lod_distances)
+        if lod:
+            result.append((distance, i, lod))
+    result.sort()
+    return result
+
+
+def build_manifest(manifest_path: str, output_path: str, chunk_world_size: float,
+                   leaf_size: int, chunk_dir: str = None) -> dict:
+    """Add an octree to a flat manifest.json and write the hierarchical manifest"""
+    with open(manifest_path) as f:
+        data = json.load(f)
+    entries = data['entries'] if isinstance(data, dict) else data
+
+    chunks = group_manifest_entries(entries, chunk_dir)
+    tree = SplatChunkOctree(chunks, chunk_world_size=chunk_world_size, leaf_size=leaf_size)
+    manifest = tree.to_manifest(entries)
+
+    with open(output_path, 'w') as f:
+        json.dump(manifest, f)
+
+    print(f"✅ Wrote {output_path}: {len(chunks):,} chunks, {tree.node_count():,} octree nodes")
+    return manifest
+
+
+def run_benchmark(chunk_count: int, queries: int, leaf_size: int, seed: int = 0) -> dict:
+    """Compare per-frame chunk selection cost for the flat and hierarchical manifests"""
+    # Large splat captures are wide and shallow: lay chunks out on a grid a few chunks tall
+    layers = 4
+    side = math.ceil(math.sqrt(chunk_count / layers))
+    entries = []
+    for i in range(side):
+        for k in range(side):
+            for j in range(layers):
+                if len(entries) >= chunk_count:
+                    break
+                center = [(i + 0.5) * DEFAULT_CHUNK_WORLD_SIZE,
+                          (j + 0.5) * DEFAULT_CHUNK_WORLD_SIZE,
+                          (k + 0.5) * DEFAULT_CHUNK_WORLD_SIZE]
+                entries.append({"i": i, "j": j, "k": k, "center": center, "lod": "low",
+                                "filename": f"chunk_{i}_{j}_{k}_low.ply", "splat_count": 1000})
+
+    chunks = group_manifest_entries(entries)
+    start = time.perf_counter()
+    tree = SplatChunkOctree(chunks, leaf_size=leaf_size)
+    build_time = time.perf_counter() - start
+
+    rng = random.Random(seed)
+    extent = side * DEFAULT_CHUNK_WORLD_SIZE
+    cameras = []
+    for _ in range(queries):
+        # Walkthrough camera: eye height, looking roughly horizontally
+        position = [rng.uniform(0, extent), 1.5, rng.uniform(0, extent)]
+        angle = rng.uniform(0, 2 * math.pi)
+        target = [position[0] + math.cos(angle), 1.5, position[2] + math.sin(angle)]
+        cameras.append((position, perspective_frustum_planes(position, target)))
+
+    start = time.perf_counter()
+    flat_results = [flat_prioritize(chunks, tree.chunk_radius, p, planes) for p, planes in cameras]
+    flat_time = (time.perf_counter() - start) / queries
+
+    start = time.perf_counter()
+    tree_results = [tree.prioritize(p, planes) for p, planes in cameras]
+    tree_time = (time.perf_counter() - start) / queries
+
+    if flat_results != tree_results:
+        raise Exception("Octree selection does not match the flat scan")
+
+    return {
+        "chunks": len(chunks),
+        "octree_nodes": tree.node_count(),
+        "build_ms": build_time * 1000,
+        "flat_ms_per_query": flat_time * 1000,
+        "octree_ms_per_query": tree_time * 1000,
+        "speedup": flat_time / tree_time if tree_time else float('inf'),
+        "avg_selected": sum(len(r) for r in tree_results) / queries
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Splat chunk manifest tooling")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build = subparsers.add_parser("build", help="Add an octree to a flat manifest.json")
+    build.add_argument("manifest")
+    build.add_argument("-o", "--output", default=None, help="Output path (default: overwrite input)")
+    build.add_argument("--chunk-world-size", type=float, default=DEFAULT_CHUNK_WORLD_SIZE)
+    build.add_argument("--leaf-size", type=int, default=8)
+    build.add_argument("--chunk-dir", default=None, help="Read splat counts from local PLY chunks")
+
+    bench = subparsers.add_parser("bench", help="Benchmark flat vs octree chunk selection")
+    bench.add_argument("--chunks", type=int, default=12000)
+    bench.add_argument("--queries", type=int, default=50)
+    bench.add_argument("--leaf-size", type=int, default=8)
+
+    args = parser.parse_args()
+
+    if args.command == "build":
+        build_manifest(args.manifest, args.output or args.manifest, args.chunk_world_size,
+                       args.leaf_size, args.chunk_dir)
+    else:
+        stats = run_benchmark(args.chunks, args.queries, args.leaf_size)
+        print(f"📦 {stats['chunks']:,} chunks, {stats['octree_nodes']:,} octree nodes "
+              f"(built in {stats['build_ms']:.1f} ms)")
+        print(f"🐢 Flat scan: {stats['flat_ms_per_query']:.3f} ms/frame")
+        print(f"🌳 Octree:    {stats['octree_ms_per_query']:.3f} ms/frame")
+        print(f"⚡ Speedup:   {stats['speedup']:.1f}x ({stats['avg_selected']:.0f} chunks selected per frame)")
+
+
+if __name__ == "__main__":
+    main()